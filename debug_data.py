@@ -1,23 +1,14 @@
+import numpy as np
 import pandas as pd
 
+from zenith_data import clean_column, read_csv
+
+
 # Load data
 print("Loading data...")
-customers = pd.read_csv("dim_customers.csv")
-spends = pd.read_csv("fact_spends.csv")
-
-# Clean column names (matching project.py logic)
-customers.columns = (
-    customers.columns.str.lower()
-    .str.strip()
-    .str.replace(" ", "_")
-    .str.replace(r"[^a-z0-9_]", "", regex=True)
-)
-spends.columns = (
-    spends.columns.str.lower()
-    .str.strip()
-    .str.replace(" ", "_")
-    .str.replace(r"[^a-z0-9_]", "", regex=True)
-)
+# Read into Arrow-backed columns with cleaned names (shared with the dashboard)
+customers = read_csv("dim_customers.csv").rename(columns=clean_column)
+spends = read_csv("fact_spends.csv").rename(columns=clean_column)
 
 print(f"Customers shape: {customers.shape}")
 print(f"Spends shape: {spends.shape}")
@@ -45,19 +36,25 @@ if 'occupation' in df.columns and 'payment_type' in df.columns:
     
     # Check if counts are identical for each occupation
     print("\nChecking for identical counts and spend within occupations:")
-    for occupation in counts['occupation'].unique():
-        occ_data = counts[counts['occupation'] == occupation]
-        unique_counts = occ_data['transaction_count'].unique()
-        unique_spend = occ_data['total_spend'].unique()
-        
-        print(f"Occupation: {occupation}")
-        print(f"  Unique Counts: {unique_counts}")
-        print(f"  Unique Spend: {unique_spend}")
+    summary = counts.groupby('occupation', sort=False).agg(
+        unique_counts=('transaction_count', 'unique'),
+        n_count=('transaction_count', 'nunique'),
+        first_count=('transaction_count', 'first'),
+        unique_spend=('total_spend', 'unique'),
+        n_spend=('total_spend', 'nunique'),
+        min_spend=('total_spend', 'min'),
+        max_spend=('total_spend', 'max'),
+    )
+
+    for row in summary.itertuples():
+        print(f"Occupation: {row.Index}")
+        print(f"  Unique Counts: {np.asarray(row.unique_counts)}")
+        print(f"  Unique Spend: {np.asarray(row.unique_spend)}")
         
-        if len(unique_counts) == 1:
-            print(f"  ⚠️  COUNTS are identical: {unique_counts[0]}")
-        if len(unique_spend) > 1:
-            print(f"  ✅  SPEND varies (Min: {unique_spend.min()}, Max: {unique_spend.max()})")
+        if row.n_count == 1:
+            print(f"  ⚠️  COUNTS are identical: {row.first_count}")
+        if row.n_spend > 1:
+            print(f"  ✅  SPEND varies (Min: {row.min_spend}, Max: {row.max_spend})")
         else:
             print(f"  ⚠️  SPEND is also identical!")
 else:
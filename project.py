@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from zenith_data import AGE_GROUPS, USD_TO_INR, filter_frame, load_frame
 
 # ================================================================
 # 🏦 Streamlit App Config
@@ -36,112 +40,263 @@ st.markdown("---")
 # ================================================================
 # 📥 Load Data
 # ================================================================
-@st.cache_data
-def load_data():
-    customers = pd.read_csv("dim_customers.csv")
-    spends = pd.read_csv("fact_spends.csv")
-
-    # Clean column names
-    customers.columns = (
-        customers.columns.str.lower()
-        .str.strip()
-        .str.replace(" ", "_")
-        .str.replace(r"[^a-z0-9_]", "", regex=True)
-    )
-    spends.columns = (
-        spends.columns.str.lower()
-        .str.strip()
-        .str.replace(" ", "_")
-        .str.replace(r"[^a-z0-9_]", "", regex=True)
-    )
-
-    # Merge
-    df = pd.merge(spends, customers, on="customer_id", how="left")
-
-    # Fix marital_status column
-    for col in df.columns:
-        if "marital" in col.lower():
-            df.rename(columns={col: "marital_status"}, inplace=True)
-            break
-
-    # Convert DOB to Age or use age_group from CSV
-    if "dob" in df.columns:
-        df["dob"] = pd.to_datetime(df["dob"], errors="coerce")
-        today = pd.to_datetime(datetime.now().date())
-        df["age"] = (today - df["dob"]).dt.days // 365
-        # Create age groups from calculated age
-        bins = [0, 20, 24, 34, 45, 120]
-        labels = ["<20", "21-24", "25-34", "35-45", "45+"]
-        df["age_group"] = pd.cut(df["age"], bins=bins, labels=labels, right=True)
-    elif "age_group" in df.columns:
-        # Use the age_group from CSV directly and create age column for filtering
-        mapping = {"21-24": 22, "25-34": 29, "35-45": 39, "45+": 50}
-        df["age"] = df["age_group"].map(mapping)
-    elif "age" not in df.columns:
-        df["age"] = np.nan
-        df["age_group"] = None
-
-    df["age"] = pd.to_numeric(df["age"], errors="coerce")
-
-    # Ensure spend numeric
-    df["spend"] = pd.to_numeric(df["spend"], errors="coerce").fillna(0)
-
-    return df
-
-
-df = load_data()
+df, age_range = load_frame()
+# Column set for the many membership checks below; filtering never changes it
+COLS = frozenset(df.columns)
 
 # ================================================================
 # 🧭 Sidebar Filters
 # ================================================================
 st.sidebar.header("🔍 Filters")
 
-if "city" in df.columns:
-    cities = sorted(df["city"].dropna().unique())
+selected_cities = selected_occupations = selected_categories = selected_age = None
+
+# Option lists straight from the categorical dtypes: already sorted and unique
+CATS = {
+    col: df[col].cat.categories.tolist()
+    for col in ("city", "occupation", "category")
+    if col in COLS
+}
+
+if "city" in COLS:
+    cities = CATS["city"]
     selected_cities = st.sidebar.multiselect("Select City", cities, default=cities)
-    df = df[df["city"].isin(selected_cities)]
 
-if "occupation" in df.columns:
-    occupations = sorted(df["occupation"].dropna().unique())
+if "occupation" in COLS:
+    occupations = CATS["occupation"]
     selected_occupations = st.sidebar.multiselect(
         "Select Occupation", occupations, default=occupations
     )
-    df = df[df["occupation"].isin(selected_occupations)]
 
-if "category" in df.columns:
-    categories = sorted(df["category"].dropna().unique())
+if "category" in COLS:
+    categories = CATS["category"]
     selected_categories = st.sidebar.multiselect(
         "Select Category", categories, default=categories
     )
-    df = df[df["category"].isin(selected_categories)]
 
-if df["age"].notnull().any():
-    min_age, max_age = int(df["age"].min()), int(df["age"].max())
+if age_range is not None:
+    min_age, max_age = age_range
     selected_age = st.sidebar.slider(
         "Select Age Range", min_age, max_age, (min_age, max_age)
     )
-    df = df[df["age"].between(selected_age[0], selected_age[1])]
+
+# Hashable snapshot of the sidebar selections, used as the aggregation cache key
+filters = (
+    tuple(selected_cities) if selected_cities is not None else None,
+    tuple(selected_occupations) if selected_occupations is not None else None,
+    tuple(selected_categories) if selected_categories is not None else None,
+    tuple(selected_age) if selected_age is not None else None,
+)
+
 
 # ================================================================
-# 💰 Currency Conversion USD → INR
+# 🧮 Cached Aggregations
 # ================================================================
-USD_TO_INR = 83
-df["spend_inr"] = df["spend"] * USD_TO_INR
+# Group keys behind each page's rollup
+ROLLUP_KEYS = {
+    "gender": ["gender"],
+    "age_group": ["age_group"],
+    "marital_status": ["city", "occupation", "marital_status"],
+    "payment_type": ["occupation", "payment_type"],
+    "occupation": ["occupation"],
+    "category": ["category"],
+}
+
+
+def _group_sums(frame, keys):
+    """Row counts and INR spend sums per observed combination of `keys`."""
+    codes, uniques = zip(*(pd.factorize(frame[k], sort=True) for k in keys))
+    # Slot 0 of every key holds its missing values, so each rollup drops
+    # missing values only for its own keys
+    shape = tuple(len(u) + 1 for u in uniques)
+    flat = np.ravel_multi_index([c + 1 for c in codes], shape)
+    n_groups = int(np.prod(shape))
+    if n_groups > len(flat):
+        observed, flat = np.unique(flat, return_inverse=True)
+    else:
+        observed = np.arange(n_groups)
+    counts = np.bincount(flat, minlength=len(observed))
+    sums = np.bincount(
+        flat, weights=frame["spend"].to_numpy(), minlength=len(observed)
+    )
+    present = np.flatnonzero(counts)
+    groups = np.unravel_index(observed[present], shape)
+    out = pd.DataFrame(
+        {
+            k: u.take(g - 1, allow_fill=True, fill_value=np.nan)
+            for k, u, g in zip(keys, uniques, groups)
+        }
+    )
+    out["size"] = counts[present]
+    out["spend_inr"] = sums[present] * USD_TO_INR
+    return out
+
+
+def agg_spend(cube, keys):
+    """Total spend (INR) per group of `keys`, rolled up from the cube."""
+    return (
+        cube.groupby(keys, observed=True)["spend_inr"].sum().reset_index()
+    )
+
+
+def agg_payment_types(cube):
+    """Transaction count and spend (INR) per occupation and payment type."""
+    return (
+        cube.groupby(["occupation", "payment_type"], observed=True)
+        .agg(transaction_count=("size", "sum"), total_spend=("spend_inr", "sum"))
+        .reset_index()
+    )
+
+
+def top_customers(frame, n=10):
+    """The `n` customers with the highest spend (INR)."""
+    ids = frame["customer_id"]
+    codes = ids.cat.codes.to_numpy()
+    known = codes >= 0
+    codes = codes[known]
+    n_ids = len(ids.cat.categories)
+    totals = np.bincount(
+        codes, weights=frame["spend"].to_numpy()[known], minlength=n_ids
+    )
+    seen = np.flatnonzero(np.bincount(codes, minlength=n_ids))
+    if len(seen) > n:
+        seen = seen[np.argpartition(totals[seen], -n)[-n:]]
+    best = seen[np.argsort(totals[seen], kind="stable")[::-1]]
+    top = pd.DataFrame(
+        {
+            "customer_id": ids.cat.categories.take(best),
+            "spend_inr": totals[best] * USD_TO_INR,
+        }
+    )
+
+    if "full_name" in frame.columns:
+        names = frame.loc[
+            ids.isin(top["customer_id"]), ["customer_id", "full_name"]
+        ].drop_duplicates("customer_id")
+        top = top.merge(names, on="customer_id", how="left")
+    return top
+
+
+def kpis(frame):
+    """Total spend (INR), distinct customers and transaction count."""
+    ids = frame["customer_id"]
+    seen = np.bincount(ids.cat.codes.to_numpy() + 1, minlength=1)[1:]
+    return {
+        # Accumulate in float64; a float32 running sum drifts at this magnitude
+        "total_spend": frame["spend"].to_numpy().sum(dtype=np.float64) * USD_TO_INR,
+        "customers": int(np.count_nonzero(seen)),
+        "transactions": len(frame),
+    }
+
+
+def _check_totals(cube, charts):
+    """Assert the occupation and gender rollups add up to the KPI total."""
+    total = charts["kpis"]["total_spend"]
+    for key in ("occupation", "gender"):
+        if key in charts:
+            missing = cube.loc[cube[key].isna(), "spend_inr"].sum()
+            rolled = charts[key]["spend_inr"].sum() + missing
+            assert np.isclose(rolled, total), f"{key} rollup drifted from KPIs"
+
+
+@st.cache_data(max_entries=32)
+def chart_data(filters):
+    """Every page's aggregation for a filter selection, keyed by chart."""
+    frame = filter_frame(load_frame()[0], *filters)
+    columns = set(frame.columns)
+    rollups = {
+        name: keys
+        for name, keys in ROLLUP_KEYS.items()
+        if columns.issuperset(keys)
+    }
+    cube_keys = list(dict.fromkeys(k for keys in rollups.values() for k in keys))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        cube = pool.submit(_group_sums, frame, cube_keys)
+        top = pool.submit(top_customers, frame)
+        totals = pool.submit(kpis, frame)
+    cube = cube.result()
+
+    charts = {
+        name: agg_spend(cube, keys)
+        for name, keys in rollups.items()
+        if name != "payment_type"
+    }
+    if "payment_type" in rollups:
+        charts["payment_type"] = agg_payment_types(cube)
+    charts["top_customers"] = top.result()
+    charts["kpis"] = totals.result()
+    _check_totals(cube, charts)
+    # Values left after filtering, in order of appearance, for the summary
+    charts["present"] = {
+        col: frame[col].unique().tolist()
+        for col in ("city", "occupation", "category")
+        if col in columns
+    }
+    return charts
+
+
+def facet_bars(frame, x, y, color, facet, wrap=2):
+    """Grouped bars of `y` by `x` and `color`, one subplot per `facet` value."""
+    facets = frame[facet].unique().tolist()
+    colors = frame[color].unique().tolist()
+    groups = frame.groupby([color, facet], observed=True, sort=False).indices
+    xs, ys = frame[x].to_numpy(), frame[y].to_numpy()
+
+    n_rows = max(1, -(-len(facets) // wrap))
+    fig = make_subplots(
+        rows=n_rows,
+        cols=wrap,
+        shared_xaxes="all",
+        shared_yaxes="all",
+        horizontal_spacing=0.02,
+        vertical_spacing=0.07,
+        subplot_titles=[f"{facet}={value}" for value in facets],
+    )
+    # One color per `color` value across all facets
+    colorway = fig.layout.template.layout.colorway or px.colors.qualitative.Plotly
+    for i, name in enumerate(colors):
+        for j, value in enumerate(facets):
+            rows = groups.get((name, value))
+            if rows is None:
+                continue
+            fig.add_trace(
+                go.Bar(
+                    x=xs[rows],
+                    y=ys[rows],
+                    name=str(name),
+                    legendgroup=str(name),
+                    showlegend=j == 0,
+                    marker_color=colorway[i % len(colorway)],
+                ),
+                row=j // wrap + 1,
+                col=j % wrap + 1,
+            )
+    fig.update_xaxes(title_text=x, row=n_rows)
+    fig.update_yaxes(title_text=y, col=1)
+    fig.update_layout(barmode="group", legend_title_text=color)
+    return fig
+
 
 # ================================================================
 # 📊 Display Pages
 # ================================================================
+# Upper bound on bars sent to the browser for open-ended category charts
+MAX_BARS = 30
+
+charts = chart_data(filters)
+
 if page == "📊 KPIs":
     st.subheader("📈 Key Performance Indicators")
+    kpi = charts["kpis"]
     c1, c2, c3 = st.columns(3)
-    c1.metric("Total Spend", f"₹{df['spend_inr'].sum():,.2f}")
-    c2.metric("Unique Customers", df["customer_id"].nunique())
-    c3.metric("Total Transactions", df.shape[0])
+    c1.metric("Total Spend", f"₹{kpi['total_spend']:,.2f}")
+    c2.metric("Unique Customers", kpi["customers"])
+    c3.metric("Total Transactions", kpi["transactions"])
 
 elif page == "🧍 Spend by Gender":
     st.subheader("🧍 Spend by Gender")
-    if "gender" in df.columns:
-        g = df.groupby("gender")["spend_inr"].sum().reset_index()
+    if "gender" in COLS:
+        g = charts["gender"]
         fig = px.pie(
             g,
             names="gender",
@@ -154,19 +309,14 @@ elif page == "🧍 Spend by Gender":
 elif page == "👥 Spend by Age Group":
     st.subheader("👥 Spend by Age Group")
 
-    all_age_groups = ["<20", "21-24", "25-34", "35-45", "45+"]
-
-    # Group by age_group only, aggregating across all dimensions
-    age_summary = df.groupby("age_group", dropna=False)["spend_inr"].sum().reset_index()
-
-    # Ensure all age groups are represented
-    all_age_df = pd.DataFrame({"age_group": all_age_groups})
-    age_summary = all_age_df.merge(age_summary, on="age_group", how="left")
-    age_summary["spend_inr"] = age_summary["spend_inr"].fillna(0)
-    age_summary["age_group"] = pd.Categorical(
-        age_summary["age_group"], categories=all_age_groups, ordered=True
+    # Spend per age group across all dimensions, with every group represented
+    age_summary = (
+        charts["age_group"]
+        .set_index("age_group")["spend_inr"]
+        .reindex(AGE_GROUPS, fill_value=0)
+        .rename_axis("age_group")
+        .reset_index()
     )
-    age_summary = age_summary.sort_values("age_group")
 
     # Plot bar chart showing all age groups
     fig_age = px.bar(
@@ -174,7 +324,7 @@ elif page == "👥 Spend by Age Group":
         x="age_group",
         y="spend_inr",
         color="age_group",
-        category_orders={"age_group": all_age_groups},
+        category_orders={"age_group": AGE_GROUPS},
         title="Spend by Age Group (INR) across City, Occupation, Category & Marital Status",
         labels={"spend_inr": "Total Spend (INR)", "age_group": "Age Group"},
         text_auto=True,
@@ -183,19 +333,9 @@ elif page == "👥 Spend by Age Group":
 
 elif page == "💍 Spend by Marital Status":
     st.subheader("💍 Spend by Marital Status")
-    m = (
-        df.groupby(["city", "occupation", "category", "marital_status"])["spend_inr"]
-        .sum()
-        .reset_index()
-    )
-    fig = px.bar(
-        m,
-        x="city",
-        y="spend_inr",
-        color="marital_status",
-        barmode="group",
-        facet_col="occupation",
-        facet_col_wrap=2,
+    m = charts["marital_status"]
+    fig = facet_bars(
+        m, x="city", y="spend_inr", color="marital_status", facet="occupation"
     )
     st.plotly_chart(fig, use_container_width=True)
 
@@ -203,20 +343,24 @@ elif page == "💳 Transactions by Payment Type":
     st.subheader("💳 Transactions by Payment Type")
 
     # Show filter summary
+    present = charts["present"]
     filter_summary = []
-    if "city" in df.columns:
-        selected = df["city"].unique().tolist()
+    if "city" in present:
+        selected = present["city"]
         filter_summary.append(f"**Cities:** {', '.join(selected)}")
-    if "occupation" in df.columns:
-        selected = df["occupation"].unique().tolist()
+    if "occupation" in present:
+        selected = present["occupation"]
         filter_summary.append(f"**Occupations:** {', '.join(selected)}")
-    if "category" in df.columns:
-        selected = df["category"].unique().tolist()
+    if "category" in present:
+        selected = present["category"]
         filter_summary.append(f"**Categories:** {', '.join(selected)}")
 
-    st.info(" | ".join(filter_summary) + f" | **Total Records:** {len(df)}")
+    st.info(
+        " | ".join(filter_summary)
+        + f" | **Total Records:** {charts['kpis']['transactions']}"
+    )
 
-    if "payment_type" in df.columns:
+    if "payment_type" in COLS:
         # Metric selection
         metric = st.radio(
             "Select Metric to Visualize:",
@@ -225,14 +369,7 @@ elif page == "💳 Transactions by Payment Type":
         )
 
         # Group by occupation and payment_type
-        tx = (
-            df.groupby(["occupation", "payment_type"])
-            .agg(
-                transaction_count=("payment_type", "size"),
-                total_spend=("spend_inr", "sum"),
-            )
-            .reset_index()
-        )
+        tx = charts["payment_type"]
 
         if metric == "Transaction Count":
             y_col = "transaction_count"
@@ -268,7 +405,7 @@ elif page == "💳 Transactions by Payment Type":
 
 elif page == "💼 Total Spend by Occupation":
     st.subheader("💼 Total Spend by Occupation")
-    o = df.groupby("occupation")["spend_inr"].sum().reset_index()
+    o = charts["occupation"]
     fig = px.bar(
         o,
         x="occupation",
@@ -280,12 +417,7 @@ elif page == "💼 Total Spend by Occupation":
 
 elif page == "🏷️ Total Spend by Category":
     st.subheader("🏷️ Total Spend by Category")
-    c = (
-        df.groupby("category")["spend_inr"]
-        .sum()
-        .reset_index()
-        .sort_values("spend_inr", ascending=False)
-    )
+    c = charts["category"].nlargest(MAX_BARS, "spend_inr")
     fig = px.bar(
         c,
         x="category",
@@ -298,19 +430,9 @@ elif page == "🏷️ Total Spend by Category":
 
 elif page == "🏆 Top 10 Spending Customers":
     st.subheader("🏆 Top 10 Spending Customers")
-    name_cols = [col for col in ["first_name", "last_name"] if col in df.columns]
-    group_cols = ["customer_id"] + name_cols
-    top10 = (
-        df.groupby(group_cols)["spend_inr"]
-        .sum()
-        .reset_index()
-        .sort_values("spend_inr", ascending=False)
-        .head(10)
-    )
-    if "first_name" in df.columns:
-        top10["name"] = (
-            top10["first_name"].fillna("") + " " + top10.get("last_name", "")
-        )
+    top10 = charts["top_customers"]
+    if "full_name" in top10.columns:
+        top10["name"] = top10["full_name"]
     else:
         top10["name"] = top10["customer_id"].astype(str)
     fig = px.bar(
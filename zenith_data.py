@@ -0,0 +1,240 @@
+"""Shared loading pipeline for the Zenith Bank spend data."""
+import csv
+import os
+import re
+import tempfile
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from datetime import datetime
+
+AGE_GROUPS = ["<20", "21-24", "25-34", "35-45", "45+"]
+AGE_EDGES = np.array([0, 20, 24, 34, 45, 120], dtype=np.int16)
+# Spend is stored in USD; rollups convert their (small) sums to INR
+USD_TO_INR = 83
+DATE_FORMAT = "%Y-%m-%d"
+CACHE_PATH = "cache.parquet"
+SOURCE_CSVS = ("dim_customers.csv", "fact_spends.csv")
+# Cleaned names of every source column _build_frame can use; the rest
+# (e.g. month, avg_income) are never parsed
+SOURCE_COLUMNS = frozenset(
+    {
+        "customer_id",
+        "spend",
+        "city",
+        "occupation",
+        "category",
+        "payment_type",
+        "gender",
+        "marital_status",
+        "maritalstatus",
+        "marital",
+        "dob",
+        "age",
+        "age_group",
+        "first_name",
+        "last_name",
+    }
+)
+_COLUMN_RE = re.compile(r"[^a-z0-9_]")
+
+
+def clean_column(name):
+    """Normalize a CSV header, e.g. "Marital Status" -> "marital_status"."""
+    return _COLUMN_RE.sub("", name.lower().strip().replace(" ", "_"))
+
+
+def read_csv(path, columns=None, dates=()):
+    """Read a CSV, optionally only `columns`, with `dates` parsed as DATE_FORMAT."""
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    wanted = None
+    if columns is not None:
+        wanted = [name for name in header if clean_column(name) in columns]
+    date_cols = [name for name in header if clean_column(name) in dates]
+    # IDs and dates are declared up front so Arrow skips type inference on
+    # them; dates stay strings until strptime so bad values can become null
+    column_types = {"customer_id": pa.string()}
+    column_types.update((name, pa.string()) for name in date_cols)
+    convert = pv.ConvertOptions(column_types=column_types, include_columns=wanted)
+    table = pv.read_csv(path, convert_options=convert)
+    for name in date_cols:
+        raw = table[name]
+        parsed = pc.strptime(raw, format=DATE_FORMAT, unit="s", error_is_null=True)
+        # strptime rolls impossible dates forward (02-29 -> 03-01); null them
+        day = pc.struct_field(pc.extract_regex(raw, r"(?P<day>\d+)$"), [0])
+        rolled = pc.not_equal(pc.day(parsed), pc.cast(day, pa.int64()))
+        parsed = pc.if_else(rolled, pa.scalar(None, parsed.type), parsed)
+        table = table.set_column(table.column_names.index(name), name, parsed)
+    # Keep text columns in Arrow's UTF-8 buffers rather than Python objects
+    arrow_strings = {pa.string(): pd.StringDtype("pyarrow")}
+    return table.to_pandas(types_mapper=arrow_strings.get)
+
+
+def join_names(first, last):
+    """Element-wise "first last" for two name Series, ignoring missing parts."""
+    first, last = first.fillna(""), last.fillna("")
+    joined = pc.binary_join_element_wise(
+        pa.array(first, pa.string()), pa.array(last, pa.string()), " "
+    )
+    return pd.Series(
+        pc.utf8_trim_whitespace(joined),
+        index=first.index,
+        dtype=pd.StringDtype("pyarrow"),
+    )
+
+
+def _build_frame():
+    # Read with cleaned column names
+    customers, spends = (
+        read_csv(path, SOURCE_COLUMNS, dates={"dob"}).rename(columns=clean_column)
+        for path in SOURCE_CSVS
+    )
+
+    # Full name per customer
+    if "first_name" in customers.columns:
+        if "last_name" in customers.columns:
+            full_name = join_names(customers["first_name"], customers["last_name"])
+        else:
+            full_name = customers["first_name"].fillna("").str.strip()
+        customers["full_name"] = full_name
+
+    # Merge: look up each spend row's customer attributes by customer_id
+    cust_idx = customers.set_index("customer_id")
+    if cust_idx.index.is_unique:
+        joined = cust_idx.reindex(spends["customer_id"].to_numpy())
+        df = pd.concat([spends, joined.reset_index(drop=True)], axis=1)
+    else:
+        df = pd.merge(spends, customers, on="customer_id", how="left")
+
+    # Fix marital_status column: headers are already cleaned, so only these
+    # spellings can occur
+    for col in ("marital_status", "maritalstatus", "marital"):
+        if col in df.columns:
+            df.rename(columns={col: "marital_status"}, inplace=True)
+            break
+
+    # Convert DOB to Age or use age_group from CSV
+    if "dob" in df.columns:
+        # Age in whole years, less one where this year's birthday is ahead
+        dob = df["dob"].to_numpy()
+        birth_year = dob.astype("datetime64[Y]")
+        birth_month = dob.astype("datetime64[M]")
+        month = (birth_month - birth_year).astype(np.int64)
+        day = (dob.astype("datetime64[D]") - birth_month).astype(np.int64) + 1
+        today = datetime.now()
+        age = np.int16(today.year) - (
+            birth_year.astype(np.int64) + 1970
+        ).astype(np.int16)
+        age -= (month * 32 + day > (today.month - 1) * 32 + today.day).astype(
+            np.int16
+        )
+        df["age"] = pd.arrays.IntegerArray(age, mask=np.isnat(birth_year))
+        # Create age groups from calculated age: right-closed bins over
+        # AGE_EDGES, ages outside them (or missing) get no group
+        ages = df["age"].to_numpy(np.int16, na_value=0)
+        codes = np.searchsorted(AGE_EDGES, ages, side="left") - 1
+        codes[codes >= len(AGE_GROUPS)] = -1
+        df["age_group"] = pd.Categorical.from_codes(
+            codes, categories=AGE_GROUPS, ordered=True
+        )
+    elif "age_group" in df.columns:
+        # Use the age_group from CSV directly and create age column for filtering
+        mapping = {"21-24": 22, "25-34": 29, "35-45": 39, "45+": 50}
+        df["age"] = df["age_group"].map(mapping)
+    elif "age" not in df.columns:
+        df["age"] = np.nan
+        df["age_group"] = None
+
+    df["age"] = pd.to_numeric(df["age"], errors="coerce")
+
+    # Keep age_group categorical so the Parquet cache preserves its order
+    if "age_group" in df.columns:
+        df["age_group"] = pd.Categorical(
+            df["age_group"], categories=AGE_GROUPS, ordered=True
+        )
+
+    # Ensure spend numeric
+    df["spend"] = pd.to_numeric(df["spend"], errors="coerce").fillna(0)
+
+    # Downcast numerics and store low-cardinality strings as categoricals so
+    # filters and groupbys work on small integer codes
+    for col in (
+        "customer_id",
+        "city",
+        "occupation",
+        "category",
+        "payment_type",
+        "gender",
+        "marital_status",
+        "full_name",
+    ):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    df["spend"] = pd.to_numeric(df["spend"], downcast="float")
+    df["age"] = pd.to_numeric(df["age"], downcast="integer")
+
+    # Keep only what the dashboard reads so every filter slice copies less
+    keep = [
+        "customer_id",
+        "spend",
+        "occupation",
+        "city",
+        "category",
+        "payment_type",
+        "gender",
+        "marital_status",
+        "age",
+        "age_group",
+        "full_name",
+    ]
+    return df[[col for col in keep if col in df.columns]]
+
+
+def _prepare_cache():
+    """Rebuild the Parquet cache if it is older than its sources; return its path."""
+    sources = [*SOURCE_CSVS, __file__]
+    if not os.path.exists(CACHE_PATH) or os.path.getmtime(CACHE_PATH) < max(
+        os.path.getmtime(path) for path in sources
+    ):
+        # A unique temp file per writer, so concurrent builds never share one
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(CACHE_PATH)),
+            prefix=os.path.basename(CACHE_PATH) + ".",
+            suffix=".parquet",
+        )
+        os.close(fd)
+        try:
+            _build_frame().to_parquet(tmp_path, compression="zstd")
+            os.replace(tmp_path, CACHE_PATH)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return CACHE_PATH
+
+
+@st.cache_resource
+def load_frame():
+    """The shared, read-only spend frame and its (min, max) age, or None."""
+    df = pd.read_parquet(_prepare_cache())
+    ages = df["age"].dropna()
+    age_range = (int(ages.min()), int(ages.max())) if len(ages) else None
+    return df, age_range
+
+
+def filter_frame(df, cities, occupations, categories, age_range):
+    """Rows of `df` matching the sidebar selections; None leaves a column unfiltered."""
+    mask = np.ones(len(df), dtype=bool)
+    if cities is not None:
+        mask &= df["city"].isin(cities).to_numpy()
+    if occupations is not None:
+        mask &= df["occupation"].isin(occupations).to_numpy()
+    if categories is not None:
+        mask &= df["category"].isin(categories).to_numpy()
+    if age_range is not None:
+        in_range = df["age"].between(age_range[0], age_range[1])
+        mask &= in_range.to_numpy(bool, na_value=False)
+    return df.loc[mask]